@@ -1,34 +1,118 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
-from functools import wraps
+from functools import lru_cache, wraps
+import json
+import math
 import os
+import queue
+import re
 import secrets
-import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import TypedDict
-
-from flask import Flask, g, redirect, render_template, request, send_from_directory, session, url_for
+from typing import Callable, TypedDict
+
+from flask import (
+    Flask,
+    g,
+    has_app_context,
+    jsonify,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    send_from_directory,
+    session,
+    url_for,
+)
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import requests
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from werkzeug.security import check_password_hash, generate_password_hash
+from psycopg2.extensions import connection as PGConnection, cursor as PGCursor
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from requests.adapters import HTTPAdapter
+from werkzeug.security import check_password_hash
+
+# SQLITE_DRIVER=pysqlite3 swaps in the pysqlite3(-binary) build of the same
+# DB-API module, which bundles a newer SQLite than most system Pythons link.
+if os.environ.get("SQLITE_DRIVER", "").strip() == "pysqlite3":
+    from pysqlite3 import dbapi2 as sqlite3
+else:
+    import sqlite3
 
 BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / "tasks.db"
 DATABASE_URL = os.environ.get("DATABASE_URL", "").strip()
 DB_BACKEND = "postgres" if DATABASE_URL else "sqlite"
 RESET_CYCLE_DAYS_DEFAULT = 90
+# Argon2id cost; the defaults are OWASP's minimum (19 MiB, 2 passes).
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", "19456"))
+# How long the id/username copy kept in the signed session is trusted.
+USER_REVALIDATE_SECONDS = 300
+# Entries kept in the per-user view cache (dashboards and overview stats).
+VIEW_CACHE_SIZE = 256
+# Rendered dashboard pages kept, one per recently active user.
+PAGE_CACHE_SIZE = 64
+PG_POOL_MIN = int(os.environ.get("PG_POOL_MIN", "1"))
+# getconn() fails rather than waits once the pool is empty, and a write
+# request holds two connections (db() plus get_conn()), so keep at least two
+# per gunicorn thread.
+PG_POOL_MAX = int(
+    os.environ.get("PG_POOL_MAX", max(20, 2 * int(os.environ.get("GUNICORN_THREADS", "8"))))
+)
+# Transaction-mode poolers (pgbouncer, Supabase pooler) cannot keep
+# server-side prepared statements between transactions.
+PG_PREPARE_STATEMENTS = os.environ.get("PG_PREPARE_STATEMENTS", "1") != "0"
+PG_PREPARED_MAX = 500
+PG_PREPARABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+PG_WRITES = ("INSERT", "UPDATE", "DELETE")
+# Idle query-only sqlite connections kept pooled; busier moments open extra
+# connections that are closed when handed back. Writes share one connection.
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "8"))
+# Largest batch /spending/bulk accepts; bigger imports are split client-side.
+SPENDING_BULK_MAX = 500
+# Seconds a writer waits for the shared write connection; matches sqlite3's
+# default busy timeout.
+SQLITE_WRITE_WAIT = 5.0
+# Per-connection settings; WAL itself is set once in ensure_db(). Under WAL,
+# NORMAL only fsyncs at checkpoints.
+SQLITE_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+PRAGMA cache_size=-20000;
+PRAGMA foreign_keys=ON;
+"""
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("APP_SECRET_KEY", "dev-secret-change-me")
-_db_ready = False
+_pg_pool: ThreadedConnectionPool | None = None
+_pg_pool_lock = threading.Lock()
+_password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST, parallelism=1
+)
+# Per-user views keyed by (view, user_id, today, users.data_version).
+_view_cache: OrderedDict[tuple[str, int, str, int], dict] = OrderedDict()
+_view_cache_lock = threading.Lock()
+# The last rendered dashboard per user as user_id -> ((data_version, minute), html);
+# kept apart so per-minute pages never evict the day-long contexts above.
+_page_cache: OrderedDict[int, tuple[tuple[int, int], str]] = OrderedDict()
+_page_cache_lock = threading.Lock()
+# Reset emails are posted in the background so Resend latency never holds a worker.
+_mail_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mail")
+_mail_session = requests.Session()
+_mail_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
 
 class RoutineItem(TypedDict):
     id: int
     label: str
-    done: bool
+    done: int
 
 
 class Routine(TypedDict):
@@ -38,11 +122,18 @@ class Routine(TypedDict):
     items: list[RoutineItem]
 
 
+def redirect_index():
+    # Built per call: the session cookie and after_request hooks write
+    # headers onto the response, so a shared instance would leak them.
+    return redirect(request.script_root + "/")
+
+
 def login_required(view):
     @wraps(view)
     def wrapped(*args, **kwargs):
         if g.user is None:
             return redirect(url_for("login"))
+        g.user_id = g.user["id"]
         return view(*args, **kwargs)
 
     return wrapped
@@ -50,16 +141,57 @@ def login_required(view):
 
 @app.before_request
 def load_user() -> None:
-    user_id = session.get("user_id")
+    user = session.get("user")
+    if user is not None and time.time() - user["checked_at"] < USER_REVALIDATE_SECONDS:
+        g.user = user
+        return
+
+    # Sessions from before the user was cached only carry user_id.
+    user_id = user["id"] if user is not None else session.get("user_id")
     if user_id is None:
         g.user = None
         return
 
-    with get_conn() as conn:
-        g.user = conn.execute(
-            "SELECT id, username FROM users WHERE id = ?",
-            (user_id,),
-        ).fetchone()
+    row = db().execute(
+        "SELECT id, username FROM users WHERE id = ?",
+        (user_id,),
+    ).fetchone()
+    if row is None:
+        session.clear()
+        g.user = None
+        return
+    g.user = remember_user(row["id"], row["username"])
+
+
+def remember_user(user_id: int, username: str) -> dict:
+    session.pop("user_id", None)
+    user = {"id": user_id, "username": username, "checked_at": int(time.time())}
+    session["user"] = user
+    return user
+
+
+UPDATE_PASSWORD_SQL = "UPDATE users SET password_hash = ? WHERE id = ?"
+BUMP_DATA_VERSION_SQL = "UPDATE users SET data_version = data_version + 1 WHERE id = ?"
+
+
+def hash_password(password: str) -> str:
+    return _password_hasher.hash(password)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    # Accounts created before Argon2 still carry Werkzeug scrypt/pbkdf2 hashes.
+    if not password_hash.startswith("$argon2"):
+        return check_password_hash(password_hash, password)
+    try:
+        return _password_hasher.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    return not password_hash.startswith("$argon2") or _password_hasher.check_needs_rehash(
+        password_hash
+    )
 
 
 @app.context_processor
@@ -67,46 +199,368 @@ def inject_user():
     return {"current_user": g.user}
 
 
+class PreparedConnection(PGConnection):
+    """psycopg2 connection that remembers the statements PREPAREd on it."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: dict[str, str] = {}
+
+
+class PGRow(tuple):
+    """Tuple row that also supports row["column"] lookups, like sqlite3.Row."""
+
+    __slots__ = ()
+    _index: dict[str, int] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def keys(self) -> list[str]:
+        return list(self._index)
+
+
+@lru_cache(maxsize=256)
+def pg_row_class(columns: tuple[str, ...]) -> type[PGRow]:
+    index = {column: i for i, column in enumerate(columns)}
+    return type("Row", (PGRow,), {"__slots__": (), "_index": index})
+
+
+class PGRowCursor(PGCursor):
+    """Cursor returning PGRow tuples; the column index is shared by every row."""
+
+    def _row_class(self) -> type[PGRow]:
+        return pg_row_class(tuple(column.name for column in self.description))
+
+    def fetchone(self):
+        row = super().fetchone()
+        return None if row is None else self._row_class()(row)
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if not rows:
+            return rows
+        row_class = self._row_class()
+        return [row_class(row) for row in rows]
+
+
+VALUES_RE = re.compile(r"\bVALUES\s*(\([^()]*\))", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def pg_sql(query: str) -> str:
+    return query.replace("?", "%s")
+
+
+@lru_cache(maxsize=512)
+def pg_positional(query: str) -> str:
+    parts = query.split("?")
+    return parts[0] + "".join(f"${index}{part}" for index, part in enumerate(parts[1:], 1))
+
+
 class DBConn:
-    def __init__(self, conn, backend: str):
+    def __init__(
+        self,
+        conn,
+        backend: str,
+        release: Callable[[bool], None] | None = None,
+        readonly: bool = False,
+    ):
         self.conn = conn
         self.backend = backend
+        # Called with discard=True when the connection must not be reused.
+        self.release = release if release is not None else lambda discard: conn.close()
+        self.readonly = readonly
+        # sqlite counts changed rows per connection; Postgres cursors report
+        # them per statement, so writes flip a flag instead.
+        self.changes = conn.total_changes if backend == "sqlite" else 0
+        self.wrote = False
 
     def execute(self, query: str, params: tuple | list = ()):
         if self.backend == "postgres":
-            sql = query.replace("?", "%s")
-            cur = self.conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(sql, params)
+            cur = self.conn.cursor(cursor_factory=PGRowCursor)
+            name = self.prepare(cur, query)
+            if name is None:
+                cur.execute(pg_sql(query), params)
+            elif params:
+                placeholders = ", ".join(["%s"] * len(params))
+                cur.execute(f"EXECUTE {name} ({placeholders})", params)
+            else:
+                cur.execute(f"EXECUTE {name}")
+            if cur.rowcount > 0 and query.lstrip()[:6].upper() in PG_WRITES:
+                self.wrote = True
             return cur
         return self.conn.execute(query, params)
 
+    def prepare(self, cur, query: str) -> str | None:
+        """Return the server-side statement name for query, preparing it once per connection."""
+        prepared = getattr(self.conn, "prepared", None)
+        if prepared is None:
+            return None
+        name = prepared.get(query)
+        if name is None:
+            if len(prepared) >= PG_PREPARED_MAX:
+                return None
+            if not query.lstrip()[:6].upper().startswith(PG_PREPARABLE):
+                return None
+            name = f"daily_stmt_{len(prepared)}"
+            cur.execute(f"PREPARE {name} AS {pg_positional(query)}")
+            prepared[query] = name
+        return name
+
+    def executemany(self, query: str, rows):
+        """Run an INSERT ... VALUES (?, ...) for every row in one statement on Postgres."""
+        if self.backend == "postgres":
+            cur = self.conn.cursor(cursor_factory=PGRowCursor)
+            match = VALUES_RE.search(query)
+            if match is None:
+                cur.executemany(pg_sql(query), rows)
+            else:
+                template = match.group(1).replace("?", "%s")
+                statement = query[: match.start(1)] + "%s" + query[match.end(1) :]
+                execute_values(cur, statement, rows, template=template, page_size=1000)
+            self.wrote = self.wrote or cur.rowcount > 0
+            return cur
+        return self.conn.executemany(query, rows)
+
     def executescript(self, script: str) -> None:
         if self.backend == "postgres":
-            statements = [s.strip() for s in script.split(";") if s.strip()]
-            for statement in statements:
-                self.execute(statement)
+            # Without parameters psycopg2 sends the whole script in one round-trip.
+            self.conn.cursor().execute(script)
+        elif self.conn.in_transaction:
+            # sqlite3's executescript would COMMIT the open transaction first,
+            # so here the script runs statement by statement. The one-batch
+            # saving only applies to Postgres; sqlite has no round-trip to save.
+            for statement in script.split(";"):
+                if statement.strip():
+                    self.conn.execute(statement)
         else:
             self.conn.executescript(script)
 
     def __enter__(self):
+        if self.backend == "sqlite":
+            # Take the write lock up front so the block commits exactly once
+            # instead of failing with SQLITE_BUSY halfway through.
+            self.conn.execute("BEGIN" if self.readonly else "BEGIN IMMEDIATE")
         return self
 
     def __exit__(self, exc_type, exc, tb):
-        if exc_type is None:
+        self.finish(commit=exc_type is None)
+
+    def changed_rows(self) -> bool:
+        if self.backend == "sqlite":
+            return self.conn.total_changes != self.changes
+        return self.wrote
+
+    def finish(self, commit: bool) -> None:
+        if commit:
+            user_id = g.get("user_id") if has_app_context() else None
+            if user_id is not None and not self.readonly and self.changed_rows():
+                # Invalidate the user's cached views in the same transaction.
+                self.execute(BUMP_DATA_VERSION_SQL, (user_id,))
             try:
                 self.conn.commit()
             except Exception:
-                pass
-        self.conn.close()
+                # A failed COMMIT can leave the transaction open; never hand
+                # that connection to the next caller.
+                try:
+                    self.conn.rollback()
+                except Exception:
+                    pass
+                self.close(discard=True)
+                raise
+        else:
+            self.conn.rollback()
+        self.close()
+
+    def close(self, discard: bool = False) -> None:
+        release, self.release = self.release, None
+        if release is not None:
+            release(discard)
+
+
+def get_pg_pool() -> ThreadedConnectionPool:
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _pg_pool = ThreadedConnectionPool(
+                    PG_POOL_MIN,
+                    PG_POOL_MAX,
+                    DATABASE_URL,
+                    connection_factory=PreparedConnection if PG_PREPARE_STATEMENTS else None,
+                )
+    return _pg_pool
+
+
+def sqlite_connect(readonly: bool = False) -> sqlite3.Connection:
+    # The dashboard alone runs a few dozen distinct statements; keep them all parsed.
+    # Autocommit mode: DBConn issues BEGIN/COMMIT itself. Pooled connections
+    # move between threads, but only one thread uses a connection at a time.
+    conn = sqlite3.connect(
+        DB_PATH,
+        cached_statements=256,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SQLITE_PRAGMAS)
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class SQLitePool:
+    """LIFO stack of idle sqlite connections that never blocks a caller."""
+
+    def __init__(self, size: int, readonly: bool):
+        self.idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue(maxsize=size)
+        self.readonly = readonly
+
+    def get(self) -> sqlite3.Connection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return sqlite_connect(self.readonly)
+
+    def put(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        if discard:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def closeall(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLiteWriter(SQLitePool):
+    """One shared write connection; writers queue for it in-process.
+
+    sqlite only ever lets one connection write, and waiting on a lock here
+    wakes immediately instead of sleeping in sqlite's busy-handler backoff.
+    If the wait times out (say a leaked connection) the caller gets a
+    connection of its own and falls back to sqlite's locking.
+    """
+
+    def __init__(self):
+        super().__init__(1, readonly=False)
+        self.lock = threading.Lock()
+        self.owner: sqlite3.Connection | None = None
+
+    def get(self) -> sqlite3.Connection:
+        if not self.lock.acquire(timeout=SQLITE_WRITE_WAIT):
+            return sqlite_connect()
+        try:
+            self.owner = super().get()
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.owner
+
+    def put(self, conn: sqlite3.Connection, discard: bool = False) -> None:
+        if conn is not self.owner:
+            super().put(conn, discard)
+            return
+        self.owner = None
+        try:
+            super().put(conn, discard)
+        finally:
+            self.lock.release()
+
+
+_sqlite_pools = {
+    False: SQLiteWriter(),
+    True: SQLitePool(SQLITE_POOL_SIZE, readonly=True),
+}
 
 
-def get_conn() -> DBConn:
+def get_conn(readonly: bool = False) -> DBConn:
     if DB_BACKEND == "postgres":
-        conn = psycopg2.connect(DATABASE_URL)
-        return DBConn(conn, "postgres")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return DBConn(conn, "sqlite")
+        pool = get_pg_pool()
+        conn = pool.getconn()
+        # psycopg2 folds this into the next BEGIN, so it costs no round-trip.
+        if bool(conn.readonly) != readonly:
+            conn.readonly = readonly
+        db_conn = DBConn(
+            conn,
+            "postgres",
+            lambda discard: pool.putconn(conn, close=discard or bool(conn.closed)),
+            readonly,
+        )
+    else:
+        sqlite_pool = _sqlite_pools[readonly]
+        conn = sqlite_pool.get()
+        db_conn = DBConn(conn, "sqlite", lambda discard: sqlite_pool.put(conn, discard), readonly)
+    if has_app_context():
+        g.setdefault("_open_conns", []).append(db_conn)
+    return db_conn
+
+
+def db() -> DBConn:
+    """Return the request-scoped read-only connection, opening it on first use."""
+    conn = g.get("db")
+    if conn is None:
+        conn = g.db = get_conn(readonly=True)
+    return conn
+
+
+@app.teardown_request
+def finish_request_db(exc: BaseException | None) -> None:
+    conn = g.pop("db", None)
+    if conn is not None:
+        conn.finish(commit=exc is None)
+
+
+@app.teardown_appcontext
+def release_db_connections(exc: BaseException | None) -> None:
+    for db_conn in g.pop("_open_conns", []):
+        if db_conn.release is not None:
+            db_conn.conn.rollback()
+            db_conn.close()
+
+
+if DB_BACKEND == "postgres":
+    JSON_OBJECT = "json_build_object"
+    JSON_ARRAY_AGG = "json_agg"
+    JSON_OBJECT_AGG = "json_object_agg"
+    JSON_NESTED = ""
+    # Whole days between the bound date and log_date.
+    DAYS_BEFORE_SQL = "(?::date - log_date::date)"
+else:
+    JSON_OBJECT = "json_object"
+    JSON_ARRAY_AGG = "json_group_array"
+    JSON_OBJECT_AGG = "json_group_object"
+    # A JSON array read back out of a subquery is plain text to sqlite.
+    JSON_NESTED = "json"
+    DAYS_BEFORE_SQL = "(julianday(?) - julianday(log_date))"
+
+
+def json_rows_sql(columns: tuple[str, ...], query: str, nested: tuple[str, ...] = ()) -> str:
+    """Wrap query in a scalar subquery that returns its rows as a JSON array of objects.
+
+    Columns listed in nested already hold JSON arrays and are embedded as such.
+    """
+    fields = ", ".join(
+        f"'{column}', {JSON_NESTED}(t.{column})" if column in nested else f"'{column}', t.{column}"
+        for column in columns
+    )
+    return f"(SELECT COALESCE({JSON_ARRAY_AGG}({JSON_OBJECT}({fields})), '[]') FROM ({query}) t)"
+
+
+def load_json(value):
+    # psycopg2 already decodes json columns; sqlite hands back text.
+    return json.loads(value) if isinstance(value, str) else value
 
 
 @app.route("/styles.css")
@@ -133,13 +587,28 @@ def send_reset_email(to_email: str, token: str, base_url: str) -> bool:
         ),
     }
 
-    response = requests.post(
-        "https://api.resend.com/emails",
-        json=payload,
-        headers={"Authorization": f"Bearer {api_key}"},
-        timeout=10,
-    )
-    return response.status_code in (200, 201)
+    _mail_pool.submit(post_email, payload, api_key)
+    return True
+
+
+def post_email(payload: dict, api_key: str) -> None:
+    try:
+        response = _mail_session.post(
+            "https://api.resend.com/emails",
+            json=payload,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=10,
+        )
+    except requests.RequestException:
+        app.logger.exception("Sending email to %s failed", payload["to"])
+        return
+    if response.status_code not in (200, 201):
+        app.logger.error(
+            "Sending email to %s failed: %s %s",
+            payload["to"],
+            response.status_code,
+            response.text[:200],
+        )
 
 
 def init_db() -> None:
@@ -152,7 +621,8 @@ def init_db() -> None:
                     username TEXT NOT NULL UNIQUE,
                     email TEXT NOT NULL,
                     password_hash TEXT NOT NULL,
-                    created_at TEXT NOT NULL
+                    created_at TEXT NOT NULL,
+                    data_version INTEGER NOT NULL DEFAULT 0
                 );
 
                 CREATE TABLE IF NOT EXISTS invites (
@@ -281,7 +751,8 @@ def init_db() -> None:
                     username TEXT NOT NULL UNIQUE,
                     email TEXT NOT NULL,
                     password_hash TEXT NOT NULL,
-                    created_at TEXT NOT NULL
+                    created_at TEXT NOT NULL,
+                    data_version INTEGER NOT NULL DEFAULT 0
                 );
 
                 CREATE TABLE IF NOT EXISTS invites (
@@ -410,40 +881,68 @@ def init_db() -> None:
 
 
 def ensure_db() -> None:
-    global _db_ready
-    if not _db_ready:
-        init_db()
-        migrate_db()
-        _db_ready = True
-
-
-def table_exists(conn: DBConn, table: str) -> bool:
-    if DB_BACKEND == "postgres":
-        row = conn.execute(
-            "SELECT to_regclass(?) as name",
-            (table,),
-        ).fetchone()
-        return row is not None and row["name"] is not None
-    row = conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-        (table,),
-    ).fetchone()
-    return row is not None
+    """Create and migrate the schema; runs once at import (see the bottom of the module)."""
+    if DB_BACKEND == "sqlite":
+        # WAL lets readers run alongside the writer. The mode is stored in
+        # the database file, and it cannot be switched inside a transaction.
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+    init_db()
+    migrate_db()
 
 
-def column_exists(conn: DBConn, table: str, column: str) -> bool:
+def table_columns(conn: DBConn) -> dict[str, set[str]]:
+    """Map each table to its column names, read in a single query."""
     if DB_BACKEND == "postgres":
         rows = conn.execute(
             """
-            SELECT column_name
+            SELECT table_name, column_name
             FROM information_schema.columns
-            WHERE table_name = ? AND column_name = ?
-            """,
-            (table, column),
+            WHERE table_schema = current_schema()
+            """
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            """
+            SELECT m.name as table_name, p.name as column_name
+            FROM sqlite_master m, pragma_table_info(m.name) p
+            WHERE m.type = 'table'
+            """
         ).fetchall()
-        return len(rows) > 0
-    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
-    return any(row["name"] == column for row in rows)
+    columns: dict[str, set[str]] = {}
+    for row in rows:
+        columns.setdefault(row["table_name"], set()).add(row["column_name"])
+    return columns
+
+
+def column_exists(schema: dict[str, set[str]], table: str, column: str) -> bool:
+    return column in schema.get(table, ())
+
+
+# Created after the column migrations so older databases already have every
+# indexed column. The same statements work on both backends. The log and
+# spending indexes carry the aggregated columns so those queries never touch
+# the table; they replace the narrower (user_id, date) indexes dropped here.
+INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_plans_pending_date
+    ON plans (scheduled_date) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_plans_user_date_status
+    ON plans (user_id, scheduled_date, status);
+CREATE INDEX IF NOT EXISTS idx_checklist_user_date
+    ON checklist_items (user_id, scheduled_date);
+CREATE INDEX IF NOT EXISTS idx_habit_logs_user_date_count
+    ON habit_logs (user_id, log_date, habit_id, count);
+CREATE INDEX IF NOT EXISTS idx_routine_logs_user_date_done
+    ON routine_item_logs (user_id, log_date, routine_item_id, done);
+CREATE INDEX IF NOT EXISTS idx_spending_user_date_category
+    ON spending_entries (user_id, spend_date, category, amount);
+CREATE INDEX IF NOT EXISTS idx_routine_items_routine_order
+    ON routine_items (routine_id, sort_order, id);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users (email);
+CREATE INDEX IF NOT EXISTS idx_habits_active_user ON habits (user_id) WHERE active = 1;
+CREATE INDEX IF NOT EXISTS idx_routines_active_user ON routines (user_id) WHERE active = 1;
+"""
 
 
 def migrate_db() -> None:
@@ -456,7 +955,8 @@ def migrate_db() -> None:
                     username TEXT NOT NULL UNIQUE,
                     email TEXT NOT NULL,
                     password_hash TEXT NOT NULL,
-                    created_at TEXT NOT NULL
+                    created_at TEXT NOT NULL,
+                    data_version INTEGER NOT NULL DEFAULT 0
                 );
 
                 CREATE TABLE IF NOT EXISTS invites (
@@ -485,12 +985,18 @@ def migrate_db() -> None:
                 );
                 """
             )
-            if table_exists(conn, "settings") and not column_exists(
-                conn, "settings", "reset_cycle_days"
-            ):
+            schema = table_columns(conn)
+            if not column_exists(schema, "settings", "reset_cycle_days"):
+                conn.execute(
+                    "ALTER TABLE settings ADD COLUMN IF NOT EXISTS"
+                    " reset_cycle_days INTEGER NOT NULL DEFAULT 90"
+                )
+            if not column_exists(schema, "users", "data_version"):
                 conn.execute(
-                    "ALTER TABLE settings ADD COLUMN reset_cycle_days INTEGER NOT NULL DEFAULT 90"
+                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS"
+                    " data_version INTEGER NOT NULL DEFAULT 0"
                 )
+            conn.executescript(INDEXES_SQL)
             return
 
         conn.execute(
@@ -500,12 +1006,14 @@ def migrate_db() -> None:
                 username TEXT NOT NULL UNIQUE,
                 email TEXT NOT NULL,
                 password_hash TEXT NOT NULL,
-                created_at TEXT NOT NULL
+                created_at TEXT NOT NULL,
+                data_version INTEGER NOT NULL DEFAULT 0
             )
             """
         )
 
-        if not column_exists(conn, "users", "email"):
+        schema = table_columns(conn)
+        if not column_exists(schema, "users", "email"):
             conn.execute("ALTER TABLE users ADD COLUMN email TEXT NOT NULL DEFAULT ''")
             conn.execute(
                 """
@@ -515,7 +1023,10 @@ def migrate_db() -> None:
                 """
             )
 
-        if table_exists(conn, "settings") and not column_exists(conn, "settings", "user_id"):
+        if not column_exists(schema, "users", "data_version"):
+            conn.execute("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0")
+
+        if "settings" in schema and not column_exists(schema, "settings", "user_id"):
             conn.execute("ALTER TABLE settings RENAME TO settings_old")
             conn.execute(
                 """
@@ -534,16 +1045,15 @@ def migrate_db() -> None:
                 """
             )
             conn.execute("DROP TABLE settings_old")
+            schema["settings"] = {"id", "user_id", "daily_spend_limit", "reset_cycle_days"}
 
-        if table_exists(conn, "settings") and not column_exists(
-            conn, "settings", "reset_cycle_days"
-        ):
+        if "settings" in schema and not column_exists(schema, "settings", "reset_cycle_days"):
             conn.execute(
                 "ALTER TABLE settings ADD COLUMN reset_cycle_days INTEGER NOT NULL DEFAULT 90"
             )
 
-        if table_exists(conn, "daily_reflections") and not column_exists(
-            conn, "daily_reflections", "user_id"
+        if "daily_reflections" in schema and not column_exists(
+            schema, "daily_reflections", "user_id"
         ):
             conn.execute("ALTER TABLE daily_reflections RENAME TO daily_reflections_old")
             conn.execute(
@@ -571,8 +1081,8 @@ def migrate_db() -> None:
             )
             conn.execute("DROP TABLE daily_reflections_old")
 
-        if table_exists(conn, "spending_budgets") and not column_exists(
-            conn, "spending_budgets", "user_id"
+        if "spending_budgets" in schema and not column_exists(
+            schema, "spending_budgets", "user_id"
         ):
             conn.execute("ALTER TABLE spending_budgets RENAME TO spending_budgets_old")
             conn.execute(
@@ -595,7 +1105,7 @@ def migrate_db() -> None:
             )
             conn.execute("DROP TABLE spending_budgets_old")
 
-        if not table_exists(conn, "invites"):
+        if "invites" not in schema:
             conn.execute(
                 """
                 CREATE TABLE invites (
@@ -610,7 +1120,7 @@ def migrate_db() -> None:
                 """
             )
 
-        if not table_exists(conn, "password_resets"):
+        if "password_resets" not in schema:
             conn.execute(
                 """
                 CREATE TABLE password_resets (
@@ -636,27 +1146,61 @@ def migrate_db() -> None:
             "spending_entries",
         ]
         for table in tables_to_update:
-            if table_exists(conn, table) and not column_exists(conn, table, "user_id"):
+            if table in schema and not column_exists(schema, table, "user_id"):
                 conn.execute(
                     f"ALTER TABLE {table} ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1"
                 )
                 conn.execute(f"UPDATE {table} SET user_id = 1 WHERE user_id IS NULL")
 
+        conn.executescript(INDEXES_SQL)
+        # Refreshes sqlite_stat1 for tables whose statistics are missing or stale.
+        conn.execute("PRAGMA optimize")
+
+
+def now_str() -> str:
+    """Local time as YYYY-MM-DDTHH:MM:SS, the format every created_at column uses."""
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+_today_cache: tuple[int, date, str] = (-1, date.min, "")
+
+
+def _today() -> tuple[int, date, str]:
+    # Local midnight falls on a minute boundary, so refreshing once a minute
+    # never serves yesterday. Rebinding the tuple is atomic across threads.
+    global _today_cache
+    minute = int(time.time() // 60)
+    if _today_cache[0] != minute:
+        today = date.today()
+        _today_cache = (minute, today, today.isoformat())
+    return _today_cache
+
+
+def _request_today() -> tuple[int, date, str]:
+    """Read the clock once per request so every query in it sees the same day."""
+    if not has_app_context():
+        return _today()
+    if "_today" not in g:
+        g._today = _today()
+    return g._today
+
+
+def current_date() -> date:
+    return _request_today()[1]
+
 
 def today_str() -> str:
-    return date.today().strftime("%Y-%m-%d")
+    return _request_today()[2]
 
 
 def normalize_cycle_days(value: int | str | None) -> int:
-    try:
-        days = int(value) if value is not None else RESET_CYCLE_DAYS_DEFAULT
-    except (TypeError, ValueError):
-        days = RESET_CYCLE_DAYS_DEFAULT
+    # Stored settings are already ints; only form input needs parsing.
+    days = value if type(value) is int else parse_int(value, RESET_CYCLE_DAYS_DEFAULT)
     return max(7, min(days, 365))
 
 
 def cycle_start_str(cycle_days: int) -> str:
-    return (date.today() - timedelta(days=cycle_days - 1)).strftime("%Y-%m-%d")
+    return (current_date() - timedelta(days=cycle_days - 1)).isoformat()
 
 
 def parse_int(value: str, default: int) -> int:
@@ -666,74 +1210,56 @@ def parse_int(value: str, default: int) -> int:
         return default
 
 
-def parse_float(value: str, default: float) -> float:
-    try:
-        return float(value)
-    except (TypeError, ValueError):
-        return default
+NUMBER_RE = re.compile(r"\s*(-?(?:\d+(?:\.\d*)?|\.\d+))\s*")
 
 
-def get_settings(user_id: int) -> sqlite3.Row:
-    with get_conn() as conn:
-        settings = conn.execute(
-            "SELECT * FROM settings WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()
-        if settings is None:
-            conn.execute(
-                """
-                INSERT INTO settings (user_id, daily_spend_limit, reset_cycle_days)
-                VALUES (?, 0, ?)
-                """,
-                (user_id, RESET_CYCLE_DAYS_DEFAULT),
-            )
-            settings = conn.execute(
-                "SELECT * FROM settings WHERE user_id = ?",
-                (user_id,),
-            ).fetchone()
+def parse_float(value: str | int | float | None, default: float) -> float:
+    # Gating strings on the regex keeps bad input off the exception path and
+    # rejects the nan/inf spellings float() would otherwise accept. Numbers
+    # (from JSON) only need to be finite; bool is an int but never an amount.
+    if type(value) in (int, float):
+        return float(value) if math.isfinite(value) else default
+    match = NUMBER_RE.fullmatch(value) if isinstance(value, str) else None
+    return float(match.group(1)) if match else default
+
+
+SETTINGS_SQL = "SELECT daily_spend_limit, reset_cycle_days FROM settings WHERE user_id = ?"
+
+
+def get_settings(user_id: int, conn: DBConn | None = None) -> sqlite3.Row | dict:
+    # Reads must not write, so a missing row means defaults; the settings
+    # handlers upsert the row on first change.
+    settings = (conn or db()).execute(SETTINGS_SQL, (user_id,)).fetchone()
+    if settings is None:
+        return {
+            "daily_spend_limit": 0.0,
+            "reset_cycle_days": RESET_CYCLE_DAYS_DEFAULT,
+        }
     return settings
 
 
-def compute_habit_streaks(
-    habits: list[sqlite3.Row], habit_log_rows: list[sqlite3.Row], max_days: int
-) -> dict[int, int]:
-    today = date.today()
-    log_map: dict[int, dict[date, int]] = {}
-    for row in habit_log_rows:
-        habit_id = row["habit_id"]
-        log_date = date.fromisoformat(row["log_date"])
-        log_map.setdefault(habit_id, {})[log_date] = row["count"]
-
-    streaks: dict[int, int] = {}
-    for habit in habits:
-        habit_id = habit["id"]
-        target = habit["target_count"]
-        streak = 0
-        for offset in range(0, max_days):
-            check_date = today - timedelta(days=offset)
-            count = log_map.get(habit_id, {}).get(check_date, 0)
-            if count >= target and target > 0:
-                streak += 1
-            else:
-                break
-        streaks[habit_id] = streak
-    return streaks
+# Pending plans scheduled before today are shown as missed at read time, so
+# dashboard requests never have to write.
+PLAN_STATUS_SQL = (
+    "CASE WHEN status = 'pending' AND scheduled_date < ? THEN 'missed' ELSE status END"
+)
 
 
-def update_missed_plans(user_id: int) -> None:
-    today_iso = today_str()
+@app.cli.command("mark-missed-plans")
+def mark_missed_plans() -> None:
+    """Persist the 'missed' status for pending plans scheduled before today."""
     with get_conn() as conn:
         conn.execute(
             """
             UPDATE plans
             SET status = 'missed'
-            WHERE status = 'pending' AND scheduled_date < ? AND user_id = ?
+            WHERE status = 'pending' AND scheduled_date < ?
             """,
-            (today_iso, user_id),
+            (today_str(),),
         )
 
 
-def get_overview_stats(user_id: int) -> dict[str, int]:
+def get_overview_stats(user_id: int, conn: DBConn | None = None) -> dict[str, int]:
     stats = {
         "plans": 0,
         "checklist": 0,
@@ -741,199 +1267,282 @@ def get_overview_stats(user_id: int) -> dict[str, int]:
         "routines": 0,
         "spending_entries": 0,
     }
-    with get_conn() as conn:
-        stats["plans"] = conn.execute(
-            "SELECT COUNT(*) as count FROM plans WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()["count"]
-        stats["checklist"] = conn.execute(
-            "SELECT COUNT(*) as count FROM checklist_items WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()["count"]
-        stats["habits"] = conn.execute(
-            "SELECT COUNT(*) as count FROM habits WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()["count"]
-        stats["routines"] = conn.execute(
-            "SELECT COUNT(*) as count FROM routines WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()["count"]
-        stats["spending_entries"] = conn.execute(
-            "SELECT COUNT(*) as count FROM spending_entries WHERE user_id = ?",
-            (user_id,),
-        ).fetchone()["count"]
+    rows = (conn or db()).execute(
+        """
+        SELECT 'plans' as name, COUNT(*) as count FROM plans WHERE user_id = ?
+        UNION ALL
+        SELECT 'checklist', COUNT(*) FROM checklist_items WHERE user_id = ?
+        UNION ALL
+        SELECT 'habits', COUNT(*) FROM habits WHERE user_id = ?
+        UNION ALL
+        SELECT 'routines', COUNT(*) FROM routines WHERE user_id = ?
+        UNION ALL
+        SELECT 'spending_entries', COUNT(*) FROM spending_entries WHERE user_id = ?
+        """,
+        (user_id,) * len(stats),
+    ).fetchall()
+    for row in rows:
+        stats[row["name"]] = row["count"]
     return stats
 
 
-@app.route("/", methods=["GET"])
-@login_required
-def index():
-    ensure_db()
-    user_id = g.user["id"]
-    update_missed_plans(user_id)
-    today_iso = today_str()
-    settings = get_settings(user_id)
-    reset_cycle_days = normalize_cycle_days(settings["reset_cycle_days"])
-    cycle_start = cycle_start_str(reset_cycle_days)
-    week_start = (date.today() - timedelta(days=6)).strftime("%Y-%m-%d")
-
-    with get_conn() as conn:
-        plans = conn.execute(
-            """
-            SELECT * FROM plans
-            WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
-            ORDER BY scheduled_date DESC, priority DESC, id ASC
-            """,
-            (cycle_start, today_iso, user_id),
-        ).fetchall()
-        checklist = conn.execute(
-            """
-            SELECT * FROM checklist_items
+# Steps of routine r with today's done flag, as a JSON array.
+ROUTINE_ITEMS_SQL = json_rows_sql(
+    ("id", "label", "done"),
+    """
+    SELECT ri.id, ri.label, COALESCE(ril.done, 0) as done
+    FROM routine_items ri
+    LEFT JOIN routine_item_logs ril ON ril.routine_item_id = ri.id
+        AND ril.log_date = ? AND ril.user_id = ri.user_id
+    WHERE ri.routine_id = r.id AND ri.user_id = r.user_id
+    ORDER BY ri.sort_order, ri.id
+    """,
+)
+
+# Every list the dashboard shows, as (name, columns, query, parameter keys).
+# They are folded into DASHBOARD_SQL so index() needs a single round-trip.
+DASHBOARD_SECTIONS: tuple[tuple[str, tuple[str, ...], str, tuple[str, ...]], ...] = (
+    (
+        "plans",
+        ("id", "title", "time_block", "priority", "scheduled_date", "status"),
+        f"""
+        SELECT id, title, time_block, priority, scheduled_date,
+            {PLAN_STATUS_SQL} as status
+        FROM plans
+        WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
+        ORDER BY scheduled_date DESC, priority DESC, id ASC
+        """,
+        ("today", "cycle_start", "today", "user_id"),
+    ),
+    (
+        "plan_counts",
+        ("done", "pending", "missed"),
+        f"""
+        SELECT COUNT(*) FILTER (WHERE status = 'done') as done,
+            COUNT(*) FILTER (WHERE status = 'pending') as pending,
+            COUNT(*) FILTER (WHERE status = 'missed') as missed
+        FROM (
+            SELECT {PLAN_STATUS_SQL} as status
+            FROM plans
             WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
-            ORDER BY scheduled_date DESC, id ASC
-            """,
-            (cycle_start, today_iso, user_id),
-        ).fetchall()
-        habits = conn.execute(
-            "SELECT * FROM habits WHERE active = 1 AND user_id = ? ORDER BY id ASC",
-            (user_id,),
-        ).fetchall()
-        habit_logs = conn.execute(
-            """
-            SELECT habit_id, count FROM habit_logs
-            WHERE log_date = ? AND user_id = ?
-            """,
-            (today_iso, user_id),
-        ).fetchall()
-        habit_logs_all = conn.execute(
-            """
-            SELECT habit_id, log_date, count
-            FROM habit_logs
-            WHERE log_date BETWEEN ? AND ? AND user_id = ?
-            """,
-            (cycle_start, today_iso, user_id),
-        ).fetchall()
-        routines = conn.execute(
-            """
-            SELECT * FROM routines
-            WHERE active = 1 AND user_id = ?
-            ORDER BY time_of_day, name
-            """,
-            (user_id,),
-        ).fetchall()
-        routine_items = conn.execute(
-            """
-            SELECT * FROM routine_items
-            WHERE routine_id IN (SELECT id FROM routines WHERE active = 1 AND user_id = ?)
-                AND user_id = ?
-            ORDER BY sort_order, id
-            """,
-            (user_id, user_id),
-        ).fetchall()
-        routine_logs = conn.execute(
-            """
-            SELECT routine_item_id, done FROM routine_item_logs
-            WHERE log_date = ? AND user_id = ?
-            """,
-            (today_iso, user_id),
-        ).fetchall()
-        spending_entries = conn.execute(
-            """
-            SELECT * FROM spending_entries
-            WHERE spend_date BETWEEN ? AND ? AND user_id = ?
-            ORDER BY spend_date DESC, created_at DESC
-            """,
-            (cycle_start, today_iso, user_id),
-        ).fetchall()
-        spending_budgets = conn.execute(
-            "SELECT * FROM spending_budgets WHERE user_id = ? ORDER BY category",
-            (user_id,),
-        ).fetchall()
-        spending_by_category = conn.execute(
-            """
-            SELECT category, SUM(amount) as total
-            FROM spending_entries
-            WHERE spend_date = ? AND user_id = ?
-            GROUP BY category
-            """,
-            (today_iso, user_id),
-        ).fetchall()
-        spending_by_category_week = conn.execute(
-            """
-            SELECT category, SUM(amount) as total
+        ) p
+        """,
+        ("today", "cycle_start", "today", "user_id"),
+    ),
+    (
+        "checklist",
+        ("id", "label", "scheduled_date", "done"),
+        """
+        SELECT id, label, scheduled_date, done FROM checklist_items
+        WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
+        ORDER BY scheduled_date DESC, id ASC
+        """,
+        ("cycle_start", "today", "user_id"),
+    ),
+    (
+        "checklist_counts",
+        ("done", "total"),
+        """
+        SELECT COUNT(*) FILTER (WHERE done = 1) as done, COUNT(*) as total
+        FROM checklist_items
+        WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
+        """,
+        ("cycle_start", "today", "user_id"),
+    ),
+    (
+        "habits",
+        ("id", "name", "target_count"),
+        """
+        SELECT id, name, target_count FROM habits
+        WHERE active = 1 AND user_id = ?
+        ORDER BY id ASC
+        """,
+        ("user_id",),
+    ),
+    (
+        "habit_counts",
+        ("hit", "total"),
+        """
+        SELECT COUNT(*) FILTER (WHERE COALESCE(hl.count, 0) >= h.target_count) as hit,
+            COUNT(*) as total
+        FROM habits h
+        LEFT JOIN habit_logs hl ON hl.habit_id = h.id
+            AND hl.log_date = ? AND hl.user_id = h.user_id
+        WHERE h.active = 1 AND h.user_id = ?
+        """,
+        ("today", "user_id"),
+    ),
+    (
+        "habit_logs",
+        ("habit_id", "count"),
+        """
+        SELECT habit_id, count FROM habit_logs
+        WHERE log_date = ? AND user_id = ?
+        """,
+        ("today", "user_id"),
+    ),
+    (
+        # Gaps and islands: ranking a habit's hit days newest first, the
+        # streak is the run of rows whose distance from today equals rank - 1.
+        "habit_streaks",
+        ("habit_id", "streak"),
+        f"""
+        SELECT habit_id, COUNT(*) as streak
+        FROM (
+            SELECT hl.habit_id, hl.log_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY hl.habit_id ORDER BY hl.log_date DESC
+                ) as rn
+            FROM habit_logs hl
+            JOIN habits h ON h.id = hl.habit_id
+            WHERE hl.user_id = ? AND hl.log_date BETWEEN ? AND ?
+                AND h.active = 1 AND h.target_count > 0
+                AND hl.count >= h.target_count
+        ) hits
+        WHERE {DAYS_BEFORE_SQL} = rn - 1
+        GROUP BY habit_id
+        """,
+        ("user_id", "cycle_start", "today", "today"),
+    ),
+    (
+        "routines",
+        ("id", "name", "time_of_day", "items"),
+        f"""
+        SELECT r.id, r.name, r.time_of_day, {ROUTINE_ITEMS_SQL} as items
+        FROM routines r
+        WHERE r.active = 1 AND r.user_id = ?
+        ORDER BY r.time_of_day, r.name
+        """,
+        ("today", "user_id"),
+    ),
+    (
+        "routine_counts",
+        ("done", "total"),
+        """
+        SELECT COUNT(*) FILTER (WHERE ril.done = 1) as done, COUNT(*) as total
+        FROM routines r
+        JOIN routine_items ri ON ri.routine_id = r.id AND ri.user_id = r.user_id
+        LEFT JOIN routine_item_logs ril ON ril.routine_item_id = ri.id
+            AND ril.log_date = ? AND ril.user_id = ri.user_id
+        WHERE r.active = 1 AND r.user_id = ?
+        """,
+        ("today", "user_id"),
+    ),
+    (
+        "spending_entries",
+        ("id", "amount", "category", "note", "spend_date"),
+        """
+        SELECT id, amount, category, note, spend_date FROM spending_entries
+        WHERE spend_date BETWEEN ? AND ? AND user_id = ?
+        ORDER BY spend_date DESC, created_at DESC
+        """,
+        ("cycle_start", "today", "user_id"),
+    ),
+    (
+        # Per-category maps for today and the last seven days plus the day and
+        # cycle totals, aggregated straight off idx_spending_user_date_category.
+        "spending_totals",
+        ("today_by_category", "week_by_category", "today_total", "cycle_total"),
+        f"""
+        SELECT
+            COALESCE({JSON_OBJECT_AGG}(category, today) FILTER (WHERE today IS NOT NULL), '{{}}')
+                as today_by_category,
+            COALESCE({JSON_OBJECT_AGG}(category, week) FILTER (WHERE week IS NOT NULL), '{{}}')
+                as week_by_category,
+            COALESCE(SUM(today), 0) as today_total,
+            COALESCE(SUM(cycle), 0) as cycle_total
+        FROM (
+            SELECT category,
+                SUM(amount) FILTER (WHERE spend_date = ?) as today,
+                SUM(amount) FILTER (WHERE spend_date >= ?) as week,
+                SUM(amount) as cycle
             FROM spending_entries
             WHERE spend_date BETWEEN ? AND ? AND user_id = ?
             GROUP BY category
-            """,
-            (week_start, today_iso, user_id),
-        ).fetchall()
-        reflection = conn.execute(
-            "SELECT * FROM daily_reflections WHERE log_date = ? AND user_id = ?",
-            (today_iso, user_id),
-        ).fetchone()
-        reflections = conn.execute(
-            """
-            SELECT * FROM daily_reflections
-            WHERE log_date BETWEEN ? AND ? AND user_id = ?
-            ORDER BY log_date DESC
-            """,
-            (cycle_start, today_iso, user_id),
-        ).fetchall()
-
-    habit_log_map = {row["habit_id"]: row["count"] for row in habit_logs}
-    habit_streaks = compute_habit_streaks(habits, habit_logs_all, reset_cycle_days)
-    routine_log_map = {row["routine_item_id"]: row["done"] for row in routine_logs}
-    spend_category_map = {row["category"]: row["total"] for row in spending_by_category}
-    spend_week_category_map = {
-        row["category"]: row["total"] for row in spending_by_category_week
-    }
-    routine_map: dict[int, Routine] = {}
-    for routine in routines:
-        routine_map[routine["id"]] = {
-            "id": routine["id"],
-            "name": routine["name"],
-            "time_of_day": routine["time_of_day"],
-            "items": [],
-        }
+        ) c
+        """,
+        ("today", "week_start", "cycle_start", "today", "user_id"),
+    ),
+    (
+        "spending_budgets",
+        ("id", "category", "daily_limit", "weekly_limit"),
+        """
+        SELECT id, category, daily_limit, weekly_limit FROM spending_budgets
+        WHERE user_id = ?
+        ORDER BY category
+        """,
+        ("user_id",),
+    ),
+    (
+        "reflections",
+        ("log_date", "mood", "wins", "blockers", "gratitude"),
+        """
+        SELECT log_date, mood, wins, blockers, gratitude FROM daily_reflections
+        WHERE log_date BETWEEN ? AND ? AND user_id = ?
+        ORDER BY log_date DESC
+        """,
+        ("cycle_start", "today", "user_id"),
+    ),
+)
+# Section columns that already hold JSON values.
+DASHBOARD_JSON_COLUMNS = ("items", "today_by_category", "week_by_category")
+DASHBOARD_SQL = "SELECT " + ",\n".join(
+    f"{json_rows_sql(columns, query, nested=DASHBOARD_JSON_COLUMNS)} AS {name}"
+    for name, columns, query, _ in DASHBOARD_SECTIONS
+)
+
+
+def load_dashboard_rows(conn: DBConn, params: dict[str, str | int]) -> dict[str, list[dict]]:
+    values = tuple(
+        params[key] for _, _, _, keys in DASHBOARD_SECTIONS for key in keys
+    )
+    row = conn.execute(DASHBOARD_SQL, values).fetchone()
+    return {name: load_json(row[name]) for name, _, _, _ in DASHBOARD_SECTIONS}
 
-    for item in routine_items:
-        routine = routine_map.get(item["routine_id"])
-        if routine is None:
-            continue
-        routine["items"].append(
-            {
-                "id": item["id"],
-                "label": item["label"],
-                "done": bool(routine_log_map.get(item["id"], 0)),
-            }
-        )
 
-    spend_total = sum(entry["amount"] for entry in spending_entries)
-    spend_total_today = sum(
-        entry["amount"] for entry in spending_entries if entry["spend_date"] == today_iso
+def load_dashboard(user_id: int) -> dict:
+    today_iso = today_str()
+    settings = get_settings(user_id)
+    reset_cycle_days = normalize_cycle_days(settings["reset_cycle_days"])
+    cycle_start = cycle_start_str(reset_cycle_days)
+    week_start = (current_date() - timedelta(days=6)).isoformat()
+
+    rows = load_dashboard_rows(
+        db(),
+        {
+            "user_id": user_id,
+            "today": today_iso,
+            "cycle_start": cycle_start,
+            "week_start": week_start,
+        },
     )
+    plans = rows["plans"]
+    checklist = rows["checklist"]
+    habits = rows["habits"]
+    habit_logs = rows["habit_logs"]
+    routines: list[Routine] = rows["routines"]
+    spending_entries = rows["spending_entries"]
+    spending_budgets = rows["spending_budgets"]
+    reflections = rows["reflections"]
+    reflection = next((r for r in reflections if r["log_date"] == today_iso), None)
+
+    habit_log_map = {row["habit_id"]: row["count"] for row in habit_logs}
+    habit_streaks = {row["habit_id"]: row["streak"] for row in rows["habit_streaks"]}
+    spending_totals = rows["spending_totals"][0]
+    spend_category_map = spending_totals["today_by_category"]
+    spend_week_category_map = spending_totals["week_by_category"]
+    spend_total = spending_totals["cycle_total"]
+    spend_total_today = spending_totals["today_total"]
     daily_spend_limit = settings["daily_spend_limit"]
     left_to_spend = (
         daily_spend_limit - spend_total_today if daily_spend_limit > 0 else None
     )
-    plans_done = sum(1 for plan in plans if plan["status"] == "done")
-    plans_pending = sum(1 for plan in plans if plan["status"] == "pending")
-    plans_missed = sum(1 for plan in plans if plan["status"] == "missed")
-    checklist_done = sum(1 for item in checklist if item["done"])
-    checklist_total = len(checklist)
-    habits_hit = 0
-    for habit in habits:
-        if habit_log_map.get(habit["id"], 0) >= habit["target_count"]:
-            habits_hit += 1
-    habit_total = len(habits)
-    routine_items_total = sum(len(routine["items"]) for routine in routine_map.values())
-    routine_items_done = sum(
-        1 for routine in routine_map.values() for item in routine["items"] if item["done"]
-    )
+    plan_counts = rows["plan_counts"][0]
+    checklist_counts = rows["checklist_counts"][0]
+    habit_counts = rows["habit_counts"][0]
+    routine_counts = rows["routine_counts"][0]
 
-    return render_template(
-        "index.html",
-        now=datetime.now(),
+    return dict(
         today_iso=today_iso,
         week_start=week_start,
         plans=plans,
@@ -941,7 +1550,7 @@ def index():
         habits=habits,
         habit_log_map=habit_log_map,
         habit_streaks=habit_streaks,
-        routines=list(routine_map.values()),
+        routines=routines,
         spending_entries=spending_entries,
         spend_total=spend_total,
         spend_total_today=spend_total_today,
@@ -953,94 +1562,162 @@ def index():
         reflection=reflection,
         reflections=reflections,
         reset_cycle_days=reset_cycle_days,
-        plans_done=plans_done,
-        plans_pending=plans_pending,
-        plans_missed=plans_missed,
-        checklist_done=checklist_done,
-        checklist_total=checklist_total,
-        habits_hit=habits_hit,
-        habit_total=habit_total,
-        routine_items_done=routine_items_done,
-        routine_items_total=routine_items_total,
+        plans_done=plan_counts["done"],
+        plans_pending=plan_counts["pending"],
+        plans_missed=plan_counts["missed"],
+        checklist_done=checklist_counts["done"],
+        checklist_total=checklist_counts["total"],
+        habits_hit=habit_counts["hit"],
+        habit_total=habit_counts["total"],
+        routine_items_done=routine_counts["done"],
+        routine_items_total=routine_counts["total"],
     )
 
 
+def data_version(user_id: int) -> int:
+    """The user's write counter, read once per request."""
+    if "_data_version" not in g:
+        row = db().execute("SELECT data_version FROM users WHERE id = ?", (user_id,)).fetchone()
+        g._data_version = row["data_version"]
+    return g._data_version
+
+
+def cached_view(view: str, user_id: int, load: Callable[[int], dict]) -> dict:
+    """Return load(user_id), reused until the user's next write or the next day."""
+    key = (view, user_id, today_str(), data_version(user_id))
+    with _view_cache_lock:
+        context = _view_cache.get(key)
+        if context is not None:
+            _view_cache.move_to_end(key)
+            return context
+
+    context = load(user_id)
+    with _view_cache_lock:
+        _view_cache[key] = context
+        while len(_view_cache) > VIEW_CACHE_SIZE:
+            _view_cache.popitem(last=False)
+    return context
+
+
+def cached_dashboard(user_id: int) -> dict:
+    return cached_view("dashboard", user_id, load_dashboard)
+
+
+def cached_dashboard_page(user_id: int, stamp: tuple[int, int]) -> str:
+    """Return the rendered dashboard, re-rendered when stamp (version, minute) moves on."""
+    with _page_cache_lock:
+        entry = _page_cache.get(user_id)
+        if entry is not None and entry[0] == stamp:
+            _page_cache.move_to_end(user_id)
+            return entry[1]
+
+    html = render_template("index.html", now=datetime.now(), **cached_dashboard(user_id))
+    with _page_cache_lock:
+        # One entry per user: a newer minute overwrites the previous one.
+        _page_cache[user_id] = (stamp, html)
+        _page_cache.move_to_end(user_id)
+        while len(_page_cache) > PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    return html
+
+
+@app.route("/", methods=["GET"])
+@login_required
+def index():
+    # The page shows the clock to the minute, so the tag and the rendered
+    # page both turn over with it.
+    user_id = g.user_id
+    stamp = (data_version(user_id), _request_today()[0])
+    etag = f"{user_id}-{stamp[0]}-{stamp[1]}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(cached_dashboard_page(user_id, stamp))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@app.route("/api/dashboard", methods=["GET"])
+@login_required
+def api_dashboard():
+    return jsonify(cached_dashboard(g.user_id))
+
+
 @app.route("/about", methods=["GET"])
 @login_required
 def about():
-    ensure_db()
-    user_id = g.user["id"]
-    update_missed_plans(user_id)
-    stats = get_overview_stats(user_id)
+    stats = cached_view("overview", g.user_id, get_overview_stats)
     return render_template("about.html", stats=stats, now=datetime.now())
 
 
 @app.route("/review", methods=["GET"])
 @login_required
 def weekly_review():
-    ensure_db()
-    user_id = g.user["id"]
-    update_missed_plans(user_id)
-    today = date.today()
+    user_id = g.user_id
+    today = current_date()
     start = today - timedelta(days=6)
-    start_iso = start.strftime("%Y-%m-%d")
-    end_iso = today.strftime("%Y-%m-%d")
-
-    with get_conn() as conn:
-        plan_stats = conn.execute(
-            """
-            SELECT status, COUNT(*) as count
+    start_iso = start.isoformat()
+    end_iso = today.isoformat()
+
+    conn = db()
+    plan_stats = conn.execute(
+        f"""
+        SELECT status, COUNT(*) as count
+        FROM (
+            SELECT {PLAN_STATUS_SQL} as status
             FROM plans
             WHERE scheduled_date BETWEEN ? AND ? AND user_id = ?
-            GROUP BY status
-            """,
-            (start_iso, end_iso, user_id),
-        ).fetchall()
-        spending_by_day = conn.execute(
-            """
-            SELECT spend_date, SUM(amount) as total
-            FROM spending_entries
-            WHERE spend_date BETWEEN ? AND ? AND user_id = ?
-            GROUP BY spend_date
-            ORDER BY spend_date DESC
-            """,
-            (start_iso, end_iso, user_id),
-        ).fetchall()
-        spending_by_category = conn.execute(
-            """
-            SELECT category, SUM(amount) as total
-            FROM spending_entries
-            WHERE spend_date BETWEEN ? AND ? AND user_id = ?
-            GROUP BY category
-            ORDER BY total DESC
-            """,
-            (start_iso, end_iso, user_id),
-        ).fetchall()
-        habit_counts = conn.execute(
-            """
-            SELECT h.name, SUM(hl.count) as total
-            FROM habits h
-            LEFT JOIN habit_logs hl ON h.id = hl.habit_id
-                AND hl.log_date BETWEEN ? AND ? AND hl.user_id = ?
-            WHERE h.active = 1 AND h.user_id = ?
-            GROUP BY h.id
-            ORDER BY total DESC
-            """,
-            (start_iso, end_iso, user_id, user_id),
-        ).fetchall()
-        routine_completions = conn.execute(
-            """
-            SELECT r.name, SUM(ril.done) as total
-            FROM routines r
-            LEFT JOIN routine_items ri ON r.id = ri.routine_id
-            LEFT JOIN routine_item_logs ril ON ri.id = ril.routine_item_id
-                AND ril.log_date BETWEEN ? AND ? AND ril.user_id = ?
-            WHERE r.active = 1 AND r.user_id = ?
-            GROUP BY r.id
-            ORDER BY total DESC
-            """,
-            (start_iso, end_iso, user_id, user_id),
-        ).fetchall()
+        ) p
+        GROUP BY status
+        """,
+        (end_iso, start_iso, end_iso, user_id),
+    ).fetchall()
+    spending_by_day = conn.execute(
+        """
+        SELECT spend_date, SUM(amount) as total
+        FROM spending_entries
+        WHERE spend_date BETWEEN ? AND ? AND user_id = ?
+        GROUP BY spend_date
+        ORDER BY spend_date DESC
+        """,
+        (start_iso, end_iso, user_id),
+    ).fetchall()
+    spending_by_category = conn.execute(
+        """
+        SELECT category, SUM(amount) as total
+        FROM spending_entries
+        WHERE spend_date BETWEEN ? AND ? AND user_id = ?
+        GROUP BY category
+        ORDER BY total DESC
+        """,
+        (start_iso, end_iso, user_id),
+    ).fetchall()
+    habit_counts = conn.execute(
+        """
+        SELECT h.name, SUM(hl.count) as total
+        FROM habits h
+        LEFT JOIN habit_logs hl ON h.id = hl.habit_id
+            AND hl.log_date BETWEEN ? AND ? AND hl.user_id = ?
+        WHERE h.active = 1 AND h.user_id = ?
+        GROUP BY h.id
+        ORDER BY total DESC
+        """,
+        (start_iso, end_iso, user_id, user_id),
+    ).fetchall()
+    routine_completions = conn.execute(
+        """
+        SELECT r.name, SUM(ril.done) as total
+        FROM routines r
+        LEFT JOIN routine_items ri ON r.id = ri.routine_id
+        LEFT JOIN routine_item_logs ril ON ri.id = ril.routine_item_id
+            AND ril.log_date BETWEEN ? AND ? AND ril.user_id = ?
+        WHERE r.active = 1 AND r.user_id = ?
+        GROUP BY r.id
+        ORDER BY total DESC
+        """,
+        (start_iso, end_iso, user_id, user_id),
+    ).fetchall()
 
     plan_stat_map = {row["status"]: row["count"] for row in plan_stats}
     return render_template(
@@ -1056,19 +1733,38 @@ def weekly_review():
     )
 
 
+# Rows created before accounts existed belong to the first user.
+BACKFILL_USER_SQL = "\n".join(
+    f"UPDATE {table} SET user_id = 1 WHERE user_id IS NULL;"
+    for table in (
+        "plans",
+        "checklist_items",
+        "routines",
+        "routine_items",
+        "routine_item_logs",
+        "habits",
+        "habit_logs",
+        "spending_entries",
+        "spending_budgets",
+        "settings",
+        "daily_reflections",
+    )
+)
+
+
 @app.route("/register", methods=["GET", "POST"])
 def register():
-    ensure_db()
     if g.user is not None:
-        return redirect(url_for("index"))
+        return redirect_index()
 
     error = ""
     invite_token = session.get("invite_token")
     if request.method == "POST":
-        username = request.form.get("username", "").strip().lower()
-        email = request.form.get("email", "").strip().lower()
-        password = request.form.get("password", "")
-        confirm = request.form.get("confirm", "")
+        form = request.form
+        username = form.get("username", "").strip().lower()
+        email = form.get("email", "").strip().lower()
+        password = form.get("password", "")
+        confirm = form.get("confirm", "")
 
         if not username or not email or not password:
             error = "Username, email, and password are required."
@@ -1076,20 +1772,21 @@ def register():
             error = "Passwords do not match."
         else:
             if invite_token:
-                with get_conn() as conn:
-                    invite = conn.execute(
-                        """
-                        SELECT * FROM invites
-                        WHERE token = ? AND used_by_user_id IS NULL
-                          AND expires_at >= ?
-                        """,
-                        (invite_token, datetime.now().isoformat(timespec="seconds")),
-                    ).fetchone()
+                invite = db().execute(
+                    """
+                    SELECT 1 FROM invites
+                    WHERE token = ? AND used_by_user_id IS NULL
+                      AND expires_at >= ?
+                    """,
+                    (invite_token, now_str()),
+                ).fetchone()
                 if invite is None:
                     error = "That invite link is invalid or expired."
                     return render_template("register.html", error=error, now=datetime.now())
 
-            now = datetime.now().isoformat(timespec="seconds")
+            now = now_str()
+            # Hash before taking the write lock; Argon2 is deliberately slow.
+            password_hash = hash_password(password)
             with get_conn() as conn:
                 user_count = conn.execute(
                     "SELECT COUNT(*) as count FROM users"
@@ -1108,54 +1805,22 @@ def register():
                     )
                 try:
                     if user_count == 0:
+                        conn.executescript(BACKFILL_USER_SQL)
                         conn.execute(
                             """
                             INSERT INTO users (id, username, email, password_hash, created_at)
                             VALUES (1, ?, ?, ?, ?)
                             """,
-                            (username, email, generate_password_hash(password), now),
+                            (username, email, password_hash, now),
                         )
                         user_id = 1
-                        conn.execute(
-                            "UPDATE plans SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE checklist_items SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE routines SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE routine_items SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE routine_item_logs SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE habits SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE habit_logs SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE spending_entries SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE spending_budgets SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE settings SET user_id = 1 WHERE user_id IS NULL"
-                        )
-                        conn.execute(
-                            "UPDATE daily_reflections SET user_id = 1 WHERE user_id IS NULL"
-                        )
                     else:
                         conn.execute(
                             """
                             INSERT INTO users (username, email, password_hash, created_at)
                             VALUES (?, ?, ?, ?)
                             """,
-                            (username, email, generate_password_hash(password), now),
+                            (username, email, password_hash, now),
                         )
                         user_id = conn.execute(
                             "SELECT id as id FROM users WHERE username = ?",
@@ -1175,8 +1840,8 @@ def register():
                 except sqlite3.IntegrityError:
                     error = "That username is taken."
                 else:
-                    session["user_id"] = user_id
-                    return redirect(url_for("index"))
+                    remember_user(user_id, username)
+                    return redirect_index()
 
     return render_template(
         "register.html",
@@ -1188,26 +1853,35 @@ def register():
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
-    ensure_db()
     if g.user is not None:
-        return redirect(url_for("index"))
+        return redirect_index()
 
     error = ""
     if request.method == "POST":
-        username = request.form.get("username", "").strip().lower()
-        password = request.form.get("password", "")
+        form = request.form
+        username = form.get("username", "").strip().lower()
+        password = form.get("password", "")
 
-        with get_conn() as conn:
-            user = conn.execute(
-                "SELECT * FROM users WHERE username = ? OR email = ?",
-                (username, username),
-            ).fetchone()
+        # Two index lookups; an OR across the columns scans the table.
+        user = db().execute(
+            """
+            SELECT id, username, password_hash FROM users WHERE username = ?
+            UNION ALL
+            SELECT id, username, password_hash FROM users WHERE email = ?
+            LIMIT 1
+            """,
+            (username, username),
+        ).fetchone()
 
-        if user is None or not check_password_hash(user["password_hash"], password):
+        if user is None or not verify_password(user["password_hash"], password):
             error = "Invalid username or password."
         else:
-            session["user_id"] = user["id"]
-            return redirect(url_for("index"))
+            if password_needs_rehash(user["password_hash"]):
+                password_hash = hash_password(password)
+                with get_conn() as conn:
+                    conn.execute(UPDATE_PASSWORD_SQL, (password_hash, user["id"]))
+            remember_user(user["id"], user["username"])
+            return redirect_index()
 
     return render_template("login.html", error=error, now=datetime.now())
 
@@ -1222,56 +1896,62 @@ def logout():
 @app.route("/account", methods=["GET", "POST"])
 @login_required
 def account():
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     message = ""
     error = ""
 
     if request.method == "POST":
-        email = request.form.get("email", "").strip().lower()
-        current_password = request.form.get("current_password", "")
-        new_password = request.form.get("new_password", "")
-        confirm_password = request.form.get("confirm_password", "")
+        form = request.form
+        email = form.get("email", "").strip().lower()
+        current_password = form.get("current_password", "")
+        new_password = form.get("new_password", "")
+        confirm_password = form.get("confirm_password", "")
+
+        user = db().execute(
+            "SELECT email, password_hash FROM users WHERE id = ?",
+            (user_id,),
+        ).fetchone()
 
-        with get_conn() as conn:
-            user = conn.execute(
-                "SELECT * FROM users WHERE id = ?",
-                (user_id,),
-            ).fetchone()
+        # Verify and hash before taking the write lock; Argon2 is deliberately slow.
+        password_error = ""
+        password_hash = None
+        if new_password:
+            if not current_password or not verify_password(
+                user["password_hash"], current_password
+            ):
+                password_error = "Current password is incorrect."
+            elif new_password != confirm_password:
+                password_error = "New passwords do not match."
+            else:
+                password_hash = hash_password(new_password)
 
-            if email and email != user["email"]:
-                email_exists = conn.execute(
-                    "SELECT 1 FROM users WHERE email = ? AND id != ?",
-                    (email, user_id),
-                ).fetchone()
-                if email_exists:
-                    error = "That email is already registered."
-                else:
-                    conn.execute(
-                        "UPDATE users SET email = ? WHERE id = ?",
+        change_email = bool(email) and email != user["email"]
+        if change_email or password_hash is not None:
+            with get_conn() as conn:
+                if change_email:
+                    email_exists = conn.execute(
+                        "SELECT 1 FROM users WHERE email = ? AND id != ?",
                         (email, user_id),
-                    )
-                    message = "Email updated."
-
-            if new_password:
-                if not current_password or not check_password_hash(
-                    user["password_hash"], current_password
-                ):
-                    error = "Current password is incorrect."
-                elif new_password != confirm_password:
-                    error = "New passwords do not match."
-                else:
-                    conn.execute(
-                        "UPDATE users SET password_hash = ? WHERE id = ?",
-                        (generate_password_hash(new_password), user_id),
-                    )
+                    ).fetchone()
+                    if email_exists:
+                        error = "That email is already registered."
+                    else:
+                        conn.execute(
+                            "UPDATE users SET email = ? WHERE id = ?",
+                            (email, user_id),
+                        )
+                        message = "Email updated."
+
+                if password_hash is not None:
+                    conn.execute(UPDATE_PASSWORD_SQL, (password_hash, user_id))
                     message = "Password updated."
+        if password_error:
+            error = password_error
 
-    with get_conn() as conn:
-        user = conn.execute(
-            "SELECT username, email FROM users WHERE id = ?",
-            (user_id,),
-        ).fetchone()
+    user = db().execute(
+        "SELECT username, email FROM users WHERE id = ?",
+        (user_id,),
+    ).fetchone()
 
     return render_template(
         "account.html",
@@ -1284,7 +1964,6 @@ def account():
 
 @app.route("/password-reset", methods=["GET", "POST"])
 def password_reset_request():
-    ensure_db()
     message = ""
     error = ""
     if request.method == "POST":
@@ -1292,11 +1971,10 @@ def password_reset_request():
         if not email:
             error = "Enter your email address."
         else:
-            with get_conn() as conn:
-                user = conn.execute(
-                    "SELECT id, email FROM users WHERE email = ?",
-                    (email,),
-                ).fetchone()
+            user = db().execute(
+                "SELECT id, email FROM users WHERE email = ?",
+                (email,),
+            ).fetchone()
             if user is None:
                 message = "If that email exists, a reset link has been sent."
             else:
@@ -1333,32 +2011,29 @@ def password_reset_request():
 
 @app.route("/password-reset/<token>", methods=["GET", "POST"])
 def password_reset(token: str):
-    ensure_db()
     error = ""
-    with get_conn() as conn:
-        reset = conn.execute(
-            """
-            SELECT * FROM password_resets
-            WHERE token = ? AND used = 0 AND expires_at >= ?
-            """,
-            (token, datetime.now().isoformat(timespec="seconds")),
-        ).fetchone()
+    reset = db().execute(
+        """
+        SELECT id, user_id FROM password_resets
+        WHERE token = ? AND used = 0 AND expires_at >= ?
+        """,
+        (token, now_str()),
+    ).fetchone()
     if reset is None:
         return render_template("password_reset_invalid.html", now=datetime.now())
 
     if request.method == "POST":
-        password = request.form.get("password", "")
-        confirm = request.form.get("confirm", "")
+        form = request.form
+        password = form.get("password", "")
+        confirm = form.get("confirm", "")
         if not password:
             error = "Password is required."
         elif password != confirm:
             error = "Passwords do not match."
         else:
+            password_hash = hash_password(password)
             with get_conn() as conn:
-                conn.execute(
-                    "UPDATE users SET password_hash = ? WHERE id = ?",
-                    (generate_password_hash(password), reset["user_id"]),
-                )
+                conn.execute(UPDATE_PASSWORD_SQL, (password_hash, reset["user_id"]))
                 conn.execute(
                     "UPDATE password_resets SET used = 1 WHERE id = ?",
                     (reset["id"],),
@@ -1373,16 +2048,14 @@ def password_reset(token: str):
     )
 @app.route("/invite/<token>", methods=["GET"])
 def accept_invite(token: str):
-    ensure_db()
-    with get_conn() as conn:
-        invite = conn.execute(
-            """
-            SELECT * FROM invites
-            WHERE token = ? AND used_by_user_id IS NULL
-              AND expires_at >= ?
-            """,
-            (token, datetime.now().isoformat(timespec="seconds")),
-        ).fetchone()
+    invite = db().execute(
+        """
+        SELECT 1 FROM invites
+        WHERE token = ? AND used_by_user_id IS NULL
+          AND expires_at >= ?
+        """,
+        (token, now_str()),
+    ).fetchone()
     if invite is None:
         return render_template("invite_invalid.html", now=datetime.now())
 
@@ -1393,31 +2066,30 @@ def accept_invite(token: str):
 @app.route("/invites", methods=["GET"])
 @login_required
 def invites():
-    ensure_db()
-    user_id = g.user["id"]
-    now = datetime.now().isoformat(timespec="seconds")
-    with get_conn() as conn:
-        active_invites = conn.execute(
-            """
-            SELECT * FROM invites
-            WHERE inviter_user_id = ?
-              AND expires_at >= ?
-              AND used_by_user_id IS NULL
-            ORDER BY created_at DESC
-            """,
-            (user_id, now),
-        ).fetchall()
-        used_invites = conn.execute(
-            """
-            SELECT i.*, u.username as used_by
-            FROM invites i
-            LEFT JOIN users u ON u.id = i.used_by_user_id
-            WHERE i.inviter_user_id = ?
-              AND i.used_by_user_id IS NOT NULL
-            ORDER BY i.created_at DESC
-            """,
-            (user_id,),
-        ).fetchall()
+    user_id = g.user_id
+    now = now_str()
+    conn = db()
+    active_invites = conn.execute(
+        """
+        SELECT token, expires_at FROM invites
+        WHERE inviter_user_id = ?
+          AND expires_at >= ?
+          AND used_by_user_id IS NULL
+        ORDER BY created_at DESC
+        """,
+        (user_id, now),
+    ).fetchall()
+    used_invites = conn.execute(
+        """
+        SELECT i.created_at, u.username as used_by
+        FROM invites i
+        LEFT JOIN users u ON u.id = i.used_by_user_id
+        WHERE i.inviter_user_id = ?
+          AND i.used_by_user_id IS NOT NULL
+        ORDER BY i.created_at DESC
+        """,
+        (user_id,),
+    ).fetchall()
     return render_template(
         "invites.html",
         now=datetime.now(),
@@ -1429,8 +2101,7 @@ def invites():
 @app.route("/invites/create", methods=["POST"])
 @login_required
 def create_invite():
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     token = secrets.token_urlsafe(16)
     now = datetime.now()
     expires_at = (now + timedelta(days=7)).isoformat(timespec="seconds")
@@ -1448,17 +2119,17 @@ def create_invite():
 @app.route("/plan/add", methods=["POST"])
 @login_required
 def add_plan():
-    ensure_db()
-    user_id = g.user["id"]
-    title = request.form.get("title", "").strip()
-    time_block = request.form.get("time_block", "").strip()
-    priority = parse_int(request.form.get("priority", "2"), 2)
-    scheduled_date = request.form.get("scheduled_date", "").strip() or today_str()
+    user_id = g.user_id
+    form = request.form
+    title = form.get("title", "").strip()
+    time_block = form.get("time_block", "").strip()
+    priority = parse_int(form.get("priority", "2"), 2)
+    scheduled_date = form.get("scheduled_date", "").strip() or today_str()
 
     if not title:
-        return redirect(url_for("index"))
+        return redirect_index()
 
-    now = datetime.now().isoformat(timespec="seconds")
+    now = now_str()
     with get_conn() as conn:
         conn.execute(
             """
@@ -1467,57 +2138,54 @@ def add_plan():
             """,
             (user_id, title, time_block, priority, scheduled_date, now),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/plan/complete/<int:plan_id>", methods=["POST"])
 @login_required
 def complete_plan(plan_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute(
             "UPDATE plans SET status = 'done' WHERE id = ? AND user_id = ?",
             (plan_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/plan/reopen/<int:plan_id>", methods=["POST"])
 @login_required
 def reopen_plan(plan_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute(
             "UPDATE plans SET status = 'pending' WHERE id = ? AND user_id = ?",
             (plan_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/plan/delete/<int:plan_id>", methods=["POST"])
 @login_required
 def delete_plan(plan_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute("DELETE FROM plans WHERE id = ? AND user_id = ?", (plan_id, user_id))
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/checklist/add", methods=["POST"])
 @login_required
 def add_checklist_item():
-    ensure_db()
-    user_id = g.user["id"]
-    label = request.form.get("label", "").strip()
-    scheduled_date = request.form.get("scheduled_date", "").strip() or today_str()
+    user_id = g.user_id
+    form = request.form
+    label = form.get("label", "").strip()
+    scheduled_date = form.get("scheduled_date", "").strip() or today_str()
 
     if not label:
-        return redirect(url_for("index"))
+        return redirect_index()
 
-    now = datetime.now().isoformat(timespec="seconds")
+    now = now_str()
     with get_conn() as conn:
         conn.execute(
             """
@@ -1526,52 +2194,46 @@ def add_checklist_item():
             """,
             (user_id, label, scheduled_date, now),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/checklist/toggle/<int:item_id>", methods=["POST"])
 @login_required
 def toggle_checklist_item(item_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
-        current = conn.execute(
-            "SELECT done FROM checklist_items WHERE id = ? AND user_id = ?",
-            (item_id, user_id),
-        ).fetchone()
-        if current is None:
-            return redirect(url_for("index"))
-        new_value = 0 if current["done"] else 1
         conn.execute(
-            "UPDATE checklist_items SET done = ? WHERE id = ? AND user_id = ?",
-            (new_value, item_id, user_id),
+            """
+            UPDATE checklist_items SET done = CASE WHEN done = 0 THEN 1 ELSE 0 END
+            WHERE id = ? AND user_id = ?
+            """,
+            (item_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/checklist/delete/<int:item_id>", methods=["POST"])
 @login_required
 def delete_checklist_item(item_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute(
             "DELETE FROM checklist_items WHERE id = ? AND user_id = ?",
             (item_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/routines/add", methods=["POST"])
 @login_required
 def add_routine():
-    ensure_db()
-    user_id = g.user["id"]
-    name = request.form.get("name", "").strip()
-    time_of_day = request.form.get("time_of_day", "any").strip()
+    user_id = g.user_id
+    form = request.form
+    name = form.get("name", "").strip()
+    time_of_day = form.get("time_of_day", "any").strip()
 
     if not name:
-        return redirect(url_for("index"))
+        return redirect_index()
 
     with get_conn() as conn:
         conn.execute(
@@ -1581,20 +2243,21 @@ def add_routine():
             """,
             (user_id, name, time_of_day),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/routine-items/add", methods=["POST"])
 @login_required
 def add_routine_item():
-    ensure_db()
-    user_id = g.user["id"]
-    routine_id = request.form.get("routine_id", "").strip()
-    label = request.form.get("label", "").strip()
-    sort_order = parse_int(request.form.get("sort_order", "0"), 0)
+    user_id = g.user_id
+    form = request.form
+    routine_id = parse_int(form.get("routine_id", ""), 0)
+    label = form.get("label", "").strip()
+    sort_order = parse_int(form.get("sort_order", "0"), 0)
 
-    if not routine_id or not label:
-        return redirect(url_for("index"))
+    # A non-numeric id would be a type error on Postgres; reject it here.
+    if routine_id <= 0 or not label:
+        return redirect_index()
 
     with get_conn() as conn:
         routine = conn.execute(
@@ -1602,7 +2265,7 @@ def add_routine_item():
             (routine_id, user_id),
         ).fetchone()
         if routine is None:
-            return redirect(url_for("index"))
+            return redirect_index()
         conn.execute(
             """
             INSERT INTO routine_items (routine_id, user_id, label, sort_order)
@@ -1610,60 +2273,38 @@ def add_routine_item():
             """,
             (routine_id, user_id, label, sort_order),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/routine-items/toggle/<int:item_id>", methods=["POST"])
 @login_required
 def toggle_routine_item(item_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     log_date = today_str()
     with get_conn() as conn:
-        item = conn.execute(
-            "SELECT id FROM routine_items WHERE id = ? AND user_id = ?",
-            (item_id, user_id),
-        ).fetchone()
-        if item is None:
-            return redirect(url_for("index"))
-        current = conn.execute(
+        # Selecting from routine_items keeps other users' items out.
+        conn.execute(
             """
-            SELECT done FROM routine_item_logs
-            WHERE routine_item_id = ? AND log_date = ? AND user_id = ?
+            INSERT INTO routine_item_logs (routine_item_id, user_id, log_date, done)
+            SELECT id, user_id, ?, 1 FROM routine_items WHERE id = ? AND user_id = ?
+            ON CONFLICT(routine_item_id, log_date)
+            DO UPDATE SET done = 1 - routine_item_logs.done
             """,
-            (item_id, log_date, user_id),
-        ).fetchone()
-        if current is None:
-            conn.execute(
-                """
-                INSERT INTO routine_item_logs (routine_item_id, user_id, log_date, done)
-                VALUES (?, ?, ?, 1)
-                """,
-                (item_id, user_id, log_date),
-            )
-        else:
-            new_value = 0 if current["done"] else 1
-            conn.execute(
-                """
-                UPDATE routine_item_logs
-                SET done = ?
-                WHERE routine_item_id = ? AND log_date = ? AND user_id = ?
-                """,
-                (new_value, item_id, log_date, user_id),
-            )
-    return redirect(url_for("index"))
+            (log_date, item_id, user_id),
+        )
+    return redirect_index()
 
 
 @app.route("/habits/add", methods=["POST"])
 @login_required
 def add_habit():
-    ensure_db()
-    user_id = g.user["id"]
-    name = request.form.get("name", "").strip()
-    target_count = parse_int(request.form.get("target_count", "1"), 1)
+    user_id = g.user_id
+    form = request.form
+    name = form.get("name", "").strip()
+    target_count = parse_int(form.get("target_count", "1"), 1)
 
     if not name:
-        return redirect(url_for("index"))
+        return redirect_index()
 
     with get_conn() as conn:
         conn.execute(
@@ -1673,219 +2314,239 @@ def add_habit():
             """,
             (user_id, name, target_count),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/habits/log/<int:habit_id>", methods=["POST"])
 @login_required
 def log_habit(habit_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     log_date = today_str()
     with get_conn() as conn:
-        habit = conn.execute(
-            "SELECT id FROM habits WHERE id = ? AND user_id = ?",
-            (habit_id, user_id),
-        ).fetchone()
-        if habit is None:
-            return redirect(url_for("index"))
-        current = conn.execute(
+        conn.execute(
             """
-            SELECT count FROM habit_logs
-            WHERE habit_id = ? AND log_date = ? AND user_id = ?
+            INSERT INTO habit_logs (habit_id, user_id, log_date, count)
+            SELECT id, user_id, ?, 1 FROM habits WHERE id = ? AND user_id = ?
+            ON CONFLICT(habit_id, log_date) DO UPDATE SET count = habit_logs.count + 1
             """,
-            (habit_id, log_date, user_id),
-        ).fetchone()
-        if current is None:
-            conn.execute(
-                """
-                INSERT INTO habit_logs (habit_id, user_id, log_date, count)
-                VALUES (?, ?, ?, 1)
-                """,
-                (habit_id, user_id, log_date),
-            )
-        else:
-            conn.execute(
-                """
-                UPDATE habit_logs
-                SET count = count + 1
-                WHERE habit_id = ? AND log_date = ? AND user_id = ?
-                """,
-                (habit_id, log_date, user_id),
-            )
-    return redirect(url_for("index"))
+            (log_date, habit_id, user_id),
+        )
+    return redirect_index()
 
 
 @app.route("/habits/reset/<int:habit_id>", methods=["POST"])
 @login_required
 def reset_habit(habit_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     log_date = today_str()
     with get_conn() as conn:
-        habit = conn.execute(
-            "SELECT id FROM habits WHERE id = ? AND user_id = ?",
-            (habit_id, user_id),
-        ).fetchone()
-        if habit is None:
-            return redirect(url_for("index"))
         conn.execute(
             """
             INSERT INTO habit_logs (habit_id, user_id, log_date, count)
-            VALUES (?, ?, ?, 0)
+            SELECT id, user_id, ?, 0 FROM habits WHERE id = ? AND user_id = ?
             ON CONFLICT(habit_id, log_date) DO UPDATE SET count = 0
             """,
-            (habit_id, user_id, log_date),
+            (log_date, habit_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
+
+
+INSERT_SPENDING_SQL = """
+INSERT INTO spending_entries (user_id, amount, category, note, spend_date, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+"""
 
 
 @app.route("/spending/add", methods=["POST"])
 @login_required
 def add_spending():
-    ensure_db()
-    user_id = g.user["id"]
-    amount_raw = request.form.get("amount", "").strip()
-    category = request.form.get("category", "").strip() or "Other"
-    note = request.form.get("note", "").strip() or "Daily spend"
-    spend_date = request.form.get("spend_date", "").strip() or today_str()
-
-    try:
-        amount = float(amount_raw)
-    except ValueError:
-        return redirect(url_for("index"))
+    user_id = g.user_id
+    form = request.form
+    category = form.get("category", "").strip() or "Other"
+    note = form.get("note", "").strip() or "Daily spend"
+    spend_date = form.get("spend_date", "").strip() or today_str()
 
+    amount = parse_float(form.get("amount", ""), 0.0)
     if amount <= 0:
-        return redirect(url_for("index"))
+        return redirect_index()
 
-    now = datetime.now().isoformat(timespec="seconds")
+    now = now_str()
+    with get_conn() as conn:
+        conn.execute(INSERT_SPENDING_SQL, (user_id, amount, category, note, spend_date, now))
+    return redirect_index()
+
+
+@app.route("/spending/bulk", methods=["POST"])
+@login_required
+def add_spending_bulk():
+    """Insert a JSON list of spending entries in one transaction."""
+    user_id = g.user_id
+    entries = request.get_json(silent=True)
+    if not isinstance(entries, list):
+        return jsonify({"error": "Expected a JSON list of entries."}), 400
+    if len(entries) > SPENDING_BULK_MAX:
+        return jsonify({"error": f"At most {SPENDING_BULK_MAX} entries per request."}), 413
+
+    today = today_str()
+    now = now_str()
+    rows = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            return jsonify({"error": f"Entry {index} must be an object."}), 400
+        amount = parse_float(entry.get("amount"), 0.0)
+        if amount <= 0:
+            return jsonify({"error": f"Entry {index} needs a positive amount."}), 400
+        category = str(entry.get("category") or "").strip() or "Other"
+        note = str(entry.get("note") or "").strip() or "Daily spend"
+        spend_date = str(entry.get("spend_date") or "").strip() or today
+        rows.append((user_id, amount, category, note, spend_date, now))
+
+    if rows:
+        # One transaction means one commit, and so one WAL sync, for the
+        # whole batch instead of one per entry.
+        with get_conn() as conn:
+            conn.executemany(INSERT_SPENDING_SQL, rows)
+    return jsonify({"inserted": len(rows)})
+
+
+# Either setting may be NULL, meaning "leave as is". The casts pin the
+# parameter types Postgres infers when preparing the statement.
+UPSERT_SETTINGS_SQL = f"""
+INSERT INTO settings (user_id, daily_spend_limit, reset_cycle_days)
+VALUES (
+    ?,
+    COALESCE(CAST(? AS REAL), 0),
+    COALESCE(CAST(? AS INTEGER), {RESET_CYCLE_DAYS_DEFAULT})
+)
+ON CONFLICT(user_id) DO UPDATE SET
+    daily_spend_limit = COALESCE(CAST(? AS REAL), settings.daily_spend_limit),
+    reset_cycle_days = COALESCE(CAST(? AS INTEGER), settings.reset_cycle_days)
+"""
+
+
+def save_settings(
+    user_id: int, daily_spend_limit: float | None = None, reset_cycle_days: int | None = None
+) -> None:
     with get_conn() as conn:
         conn.execute(
-            """
-            INSERT INTO spending_entries (user_id, amount, category, note, spend_date, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, amount, category, note, spend_date, now),
+            UPSERT_SETTINGS_SQL,
+            (user_id, daily_spend_limit, reset_cycle_days, daily_spend_limit, reset_cycle_days),
         )
-    return redirect(url_for("index"))
 
 
 @app.route("/settings/spend-limit", methods=["POST"])
 @login_required
 def update_spend_limit():
-    ensure_db()
-    user_id = g.user["id"]
     daily_limit = parse_float(request.form.get("daily_spend_limit", "0"), 0.0)
-    with get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO settings (user_id, daily_spend_limit)
-            VALUES (?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET daily_spend_limit = excluded.daily_spend_limit
-            """,
-            (user_id, daily_limit),
-        )
-    return redirect(url_for("index"))
+    save_settings(g.user_id, daily_spend_limit=daily_limit)
+    return redirect_index()
 
 
 @app.route("/settings/reset-cycle", methods=["POST"])
 @login_required
 def update_reset_cycle():
-    ensure_db()
-    user_id = g.user["id"]
     cycle_days = normalize_cycle_days(request.form.get("reset_cycle_days", ""))
-    with get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO settings (user_id, daily_spend_limit, reset_cycle_days)
-            VALUES (?, 0, ?)
-            ON CONFLICT(user_id) DO UPDATE SET reset_cycle_days = excluded.reset_cycle_days
-            """,
-            (user_id, cycle_days),
-        )
-    return redirect(url_for("index"))
+    save_settings(g.user_id, reset_cycle_days=cycle_days)
+    return redirect_index()
+
+
+UPSERT_REFLECTION_SQL = """
+INSERT INTO daily_reflections (user_id, log_date, mood, wins, blockers, gratitude, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id, log_date) DO UPDATE SET
+    mood = excluded.mood,
+    wins = excluded.wins,
+    blockers = excluded.blockers,
+    gratitude = excluded.gratitude
+"""
 
 
 @app.route("/reflection/save", methods=["POST"])
 @login_required
 def save_reflection():
-    ensure_db()
-    user_id = g.user["id"]
-    log_date = request.form.get("log_date", "").strip() or today_str()
-    mood = request.form.get("mood", "").strip()
-    wins = request.form.get("wins", "").strip()
-    blockers = request.form.get("blockers", "").strip()
-    gratitude = request.form.get("gratitude", "").strip()
-    created_at = datetime.now().isoformat(timespec="seconds")
+    user_id = g.user_id
+    form = request.form
+    log_date = form.get("log_date", "").strip() or today_str()
+    mood = form.get("mood", "").strip()
+    wins = form.get("wins", "").strip()
+    blockers = form.get("blockers", "").strip()
+    gratitude = form.get("gratitude", "").strip()
+    created_at = now_str()
 
     with get_conn() as conn:
         conn.execute(
-            """
-            INSERT INTO daily_reflections (user_id, log_date, mood, wins, blockers, gratitude, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id, log_date) DO UPDATE SET
-                mood = excluded.mood,
-                wins = excluded.wins,
-                blockers = excluded.blockers,
-                gratitude = excluded.gratitude
-            """,
+            UPSERT_REFLECTION_SQL,
             (user_id, log_date, mood, wins, blockers, gratitude, created_at),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
+
+
+UPSERT_BUDGET_SQL = """
+INSERT INTO spending_budgets (user_id, category, daily_limit, weekly_limit)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(user_id, category) DO UPDATE SET
+    daily_limit = excluded.daily_limit,
+    weekly_limit = excluded.weekly_limit
+"""
 
 
 @app.route("/budgets/add", methods=["POST"])
 @login_required
 def add_budget():
-    ensure_db()
-    user_id = g.user["id"]
-    category = request.form.get("category", "").strip()
-    daily_limit = parse_float(request.form.get("daily_limit", "0"), 0.0)
-    weekly_limit = parse_float(request.form.get("weekly_limit", "0"), 0.0)
+    user_id = g.user_id
+    form = request.form
+    category = form.get("category", "").strip()
+    daily_limit = parse_float(form.get("daily_limit", "0"), 0.0)
+    weekly_limit = parse_float(form.get("weekly_limit", "0"), 0.0)
 
     if not category:
-        return redirect(url_for("index"))
+        return redirect_index()
 
     with get_conn() as conn:
-        conn.execute(
-            """
-            INSERT INTO spending_budgets (user_id, category, daily_limit, weekly_limit)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(user_id, category) DO UPDATE SET
-                daily_limit = excluded.daily_limit,
-                weekly_limit = excluded.weekly_limit
-            """,
-            (user_id, category, daily_limit, weekly_limit),
-        )
-    return redirect(url_for("index"))
+        conn.execute(UPSERT_BUDGET_SQL, (user_id, category, daily_limit, weekly_limit))
+    return redirect_index()
 
 
 @app.route("/budgets/delete/<int:budget_id>", methods=["POST"])
 @login_required
 def delete_budget(budget_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute(
             "DELETE FROM spending_budgets WHERE id = ? AND user_id = ?",
             (budget_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
 
 
 @app.route("/spending/delete/<int:entry_id>", methods=["POST"])
 @login_required
 def delete_spending(entry_id: int):
-    ensure_db()
-    user_id = g.user["id"]
+    user_id = g.user_id
     with get_conn() as conn:
         conn.execute(
             "DELETE FROM spending_entries WHERE id = ? AND user_id = ?",
             (entry_id, user_id),
         )
-    return redirect(url_for("index"))
+    return redirect_index()
+
+
+def close_connections() -> None:
+    """Drop pooled connections so forked workers never share the parent's sockets."""
+    global _pg_pool
+    if _pg_pool is not None:
+        _pg_pool.closeall()
+        _pg_pool = None
+    for sqlite_pool in _sqlite_pools.values():
+        sqlite_pool.closeall()
+
+
+# Create and migrate the schema once per process instead of in every view.
+if os.environ.get("SKIP_DB_INIT") != "1":
+    ensure_db()
+    close_connections()
 
 
 if __name__ == "__main__":
-    init_db()
-    app.run(debug=True)
+    # Development server only; production runs under gunicorn (gunicorn.conf.py).
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1")
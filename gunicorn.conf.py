@@ -0,0 +1,14 @@
+"""gunicorn settings, picked up automatically by `gunicorn app:app`."""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+# Threads share each worker's connection pools; handlers spend most of their
+# time waiting on the database, which releases the GIL.
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+# Import the app once in the master: the schema is created and migrated a
+# single time before forking, instead of racing across every worker's import.
+# The import closes its connections afterwards, so workers never share them.
+preload_app = True